@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Warm the disk-persisted caches for the default group selection.
+
+Run at container build (or deploy) so the first visitor hits
+pre-serialized results instead of paying for the full
+fetch -> process -> analyze pipeline on a cold start.
+"""
+
+import pandas as pd
+
+from utils import load_clean_tracker, get_group_bundle
+
+URL = 'https://checkmyads.org/wp-content/themes/checkmyads/tracker-data.txt'
+
+
+def main():
+    clean_tracker = load_clean_tracker(URL)
+
+    # Mirror app.py: the default selectbox choice is the last category
+    default_group = clean_tracker['standard_group'].cat.categories[::-1][0]
+    tracker_version = int(pd.util.hash_pandas_object(clean_tracker.index).sum())
+
+    get_group_bundle(default_group, tracker_version, clean_tracker)
+    print(f"Warmed caches for default group '{default_group}'")
+
+
+if __name__ == '__main__':
+    main()
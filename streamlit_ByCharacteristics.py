@@ -10,76 +10,194 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
+import re
 import requests
-import json
-import itertools
-from scipy.stats import ttest_ind
-from itertools import combinations
+from requests.adapters import HTTPAdapter, Retry
+import pyarrow as pa
+import pyarrow.json as paj
+from scipy.special import stdtr
+
+# Use pandas' numba groupby kernels for the numeric reductions when numba
+# is installed; otherwise fall back to the default Cython path
+try:
+    import numba  # noqa: F401
+    _NUMBA_GROUPBY_KWARGS = {'engine': 'numba', 'engine_kwargs': {'parallel': False, 'nogil': True}}
+except ImportError:
+    _NUMBA_GROUPBY_KWARGS = {}
+
+# Only the fields this app touches — the C++ NDJSON reader skips the rest
+_TRACKER_SCHEMA = pa.schema([
+    ('timestamp', pa.string()),
+    ('uuid', pa.string()),
+    ('event', pa.string()),
+    ('data', pa.struct([
+        # group arrives as a JSON number (1-4); a string type here makes the
+        # strict Arrow parser reject the column outright
+        ('group', pa.int64()),
+        ('url', pa.string()),
+        ('referrer', pa.string())
+    ]))
+])
+
+
+def welch_pairwise(numeric_df, numeric_cols, group_col='random_group'):
+    """Welch t and p for every group pair and metric in one broadcasted pass.
+
+    Returns (groups, pair_i, pair_j, t, p) where t and p have shape
+    (#pairs, #metrics); NaN where a group has fewer than two observations.
+    """
+    # sort stays on so pair labels are deterministic; observed=True skips
+    # category levels absent from the selected slice
+    gb = numeric_df.groupby(group_col, observed=True)[numeric_cols]
+    mean_df = gb.mean()
+    groups = mean_df.index.tolist()
+    mean = mean_df.to_numpy(dtype=float)
+    var = gb.var(ddof=1).to_numpy(dtype=float)
+    n = gb.count().to_numpy(dtype=float)
+
+    pair_i, pair_j = np.triu_indices(len(groups), 1)
+    vi, vj = var[pair_i] / n[pair_i], var[pair_j] / n[pair_j]
+    se2 = vi + vj
+    t = (mean[pair_i] - mean[pair_j]) / np.sqrt(se2)
+    dof = se2 ** 2 / (vi ** 2 / (n[pair_i] - 1) + vj ** 2 / (n[pair_j] - 1))
+    p = 2 * stdtr(dof, -np.abs(t))
+    return groups, pair_i, pair_j, t, p
+
+# Pooled session so reruns reuse the TCP+TLS connection instead of
+# re-handshaking on every fetch
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=10, pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.3)
+))
 
 # Function to fetch and process data from URL
-def fetch_and_process_data(url):
-    response = requests.get(url)
+def fetch_and_process_data(url, session=SESSION):
+    response = session.get(url, timeout=10)
     if response.status_code != 200:
         raise Exception(f"Failed to fetch data from {url}. HTTP Status Code: {response.status_code}")
 
-    raw_data = [json.loads(line) for line in response.text.splitlines() if line.strip()]
-    clean_tracker = pd.json_normalize(raw_data)[['timestamp', 'uuid', 'event', 'data.group', 'data.url', 'data.sessionCount', 'data.referrer']]
-    clean_tracker.columns = ['timestamp', 'uuid', 'event', 'group', 'url', 'sessionCount', 'referrer']
+    # Multithreaded C++ NDJSON parse straight into Arrow columns — no
+    # per-line json.loads and no json_normalize dict flattening
+    table = paj.read_json(
+        pa.BufferReader(pa.py_buffer(response.content)),
+        parse_options=paj.ParseOptions(
+            explicit_schema=_TRACKER_SCHEMA,
+            unexpected_field_behavior='ignore'
+        )
+    )
+    clean_tracker = table.flatten().rename_columns(
+        ['timestamp', 'uuid', 'event', 'group', 'url', 'referrer']
+    ).to_pandas()
     clean_tracker['timestamp'] = pd.to_datetime(clean_tracker['timestamp'], errors='coerce', utc=True)
+    # Low-cardinality strings as category: groupbys run on int codes and the
+    # frame shrinks; downstream .str ops go through .astype('string') already.
+    # group stays numeric — random_group is derived from it and must survive
+    # the select_dtypes numeric filter in _compute_output_tables
+    for col in ['uuid', 'event', 'url', 'referrer']:
+        clean_tracker[col] = clean_tracker[col].astype('category')
     return clean_tracker
 
+_TEST_GROUP_PATTERN = re.compile(r'test_group_v\d+')
+
+
 # Function to process the tracker data
 def process_clean_tracker(clean_tracker):
-    clean_tracker['test_group'] = clean_tracker['event'].str.extract(r'(test_group_v\d+)').ffill()
-    clean_tracker['test_group'].fillna('test_group_v1', inplace=True)
-    clean_tracker['random_group'] = clean_tracker.groupby(['uuid', 'test_group'])['group'].transform(lambda g: g.ffill().bfill())
+    # Event cardinality is tiny while rows number in the millions — run the
+    # compiled regex once per distinct event and broadcast with map instead
+    # of matching per row
+    lut = {
+        e: (m.group(0) if (m := _TEST_GROUP_PATTERN.search(e)) else None)
+        for e in clean_tracker['event'].dropna().unique()
+    }
+    clean_tracker['test_group'] = clean_tracker['event'].map(lut).ffill()
+    clean_tracker['test_group'] = clean_tracker['test_group'].fillna('test_group_v1').astype('category')
+    # Built-in Cython groupby fills instead of a Python lambda per
+    # (uuid, test_group) pair; row order is untouched so fills still follow
+    # the tracker's append order
+    keys = ['uuid', 'test_group']
+    clean_tracker['random_group'] = clean_tracker.groupby(keys, sort=False, observed=True)['group'].ffill()
+    clean_tracker['random_group'] = clean_tracker.groupby(keys, sort=False, observed=True)['random_group'].bfill()
     return clean_tracker
 
+# Per-uuid event counts and URL/referrer presence flags
+EVENT_COUNT_COLS = {
+    'num_sessions': 'session_start',
+    'num_page_views': 'page_view',
+    'num_referral': 'referral',
+    'num_newsletter_signup': 'newsletter_signup',
+    'num_donation': 'donation'
+}
+URL_PRESENCE_COLS = {
+    'view_about': 'checkmyads.org/about',
+    'view_news': 'checkmyads.org/news',
+    'view_donate': 'checkmyads.org/donate',
+    'view_google_trial': 'checkmyads.org/google',
+    'view_shop': 'checkmyads.org/shop'
+}
+REFERRER_PRESENCE_COLS = {
+    'referral_google': 'google',
+    'referral_pcgamer': 'pcgamer',
+    'referral_globalprivacycontrol': 'globalprivacycontrol',
+    'referral_duckduckgo': 'duckduckgo'
+}
+
+
 # Function to calculate additional metrics
+@st.cache_data(ttl=300, show_spinner=False)
 def process_event_data(clean_tracker):
-    def count_event(event_series, event_name):
-        return (event_series == event_name).sum()
-
-    def calculate_homepage_pct(url_series, event_series):
-        page_view_count = (event_series == 'page_view').sum()
-        if page_view_count > 0:
-            return (url_series == 'https://checkmyads.org/').sum() / page_view_count
-        return np.nan
-
-    def check_url_presence(url_series, keyword):
-        return int(any(isinstance(ref, str) and keyword in ref.lower() for ref in url_series))
-
-    uuid_tracker = clean_tracker.groupby('uuid').agg(
-        random_group=('random_group', 'first'),
-        num_sessions=('event', lambda x: count_event(x, 'session_start')),
-        num_page_views=('event', lambda x: count_event(x, 'page_view')),
-        num_referral=('event', lambda x: count_event(x, 'referral')),
-        num_newsletter_signup=('event', lambda x: count_event(x, 'newsletter_signup')),
-        num_donation=('event', lambda x: count_event(x, 'donation')),
-
-        first_session_start_time=('timestamp', lambda x: x.loc[clean_tracker['event'] == 'session_start'].min()),
-        average_session_start_time=('timestamp', lambda x: x.loc[clean_tracker['event'] == 'session_start'].mean()),
-        last_session_start_time=('timestamp', lambda x: x.loc[clean_tracker['event'] == 'session_start'].max()),
-
-        homepage_pct=('url', lambda x: calculate_homepage_pct(x, clean_tracker['event'])),
-
-        view_about=('url', lambda x: check_url_presence(x, 'checkmyads.org/about')),
-        view_news=('url', lambda x: check_url_presence(x, 'checkmyads.org/news')),
-        view_donate=('url', lambda x: check_url_presence(x, 'checkmyads.org/donate')),
-        view_google_trial=('url', lambda x: check_url_presence(x, 'checkmyads.org/google')),
-        view_shop=('url', lambda x: check_url_presence(x, 'checkmyads.org/shop')),
-
-        referral_google=('referrer', lambda x: check_url_presence(x, 'google')),
-        referral_pcgamer=('referrer', lambda x: check_url_presence(x, 'pcgamer')),
-        referral_globalprivacycontrol=('referrer', lambda x: check_url_presence(x, 'globalprivacycontrol')),
-        referral_duckduckgo=('referrer', lambda x: check_url_presence(x, 'duckduckgo'))
-    ).reset_index()
+    # Build every indicator once on the full frame with vectorized string
+    # kernels, then aggregate in a single groupby — no per-group Python
+    # lambdas scanning the url/referrer columns
+    ev = clean_tracker['event']
+    url_l = clean_tracker['url'].astype('string').str.lower()
+    ref_l = clean_tracker['referrer'].astype('string').str.lower()
+
+    flags = {
+        name: (ev == event).astype('uint8')
+        for name, event in EVENT_COUNT_COLS.items()
+    }
+    # Homepage hits among page views only, matching the main pipeline
+    flags['home_hit'] = ((clean_tracker['url'] == 'https://checkmyads.org/') & (ev == 'page_view')).astype('uint8')
+    flags.update({
+        name: url_l.str.contains(kw, regex=False).fillna(False).astype('uint8')
+        for name, kw in URL_PRESENCE_COLS.items()
+    })
+    flags.update({
+        name: ref_l.str.contains(kw, regex=False).fillna(False).astype('uint8')
+        for name, kw in REFERRER_PRESENCE_COLS.items()
+    })
+
+    flag_frame = pd.DataFrame(flags, index=clean_tracker.index)
+    flag_frame['uuid'] = clean_tracker['uuid']
+    flag_frame['random_group'] = clean_tracker['random_group']
+    flag_frame['session_ts'] = clean_tracker['timestamp'].where(ev == 'session_start')
+
+    grouped = flag_frame.groupby('uuid', sort=False, observed=True)
+    # Back to int64: the balance tables select float64/int64 columns, so the
+    # unsigned dtypes the uint8 flags aggregate into would silently drop
+    # every count and presence metric from the characteristic selector
+    counts = grouped[list(EVENT_COUNT_COLS) + ['home_hit']].sum().astype('int64')
+    presence = grouped[list(URL_PRESENCE_COLS) + list(REFERRER_PRESENCE_COLS)].max().astype('int64')
+    session_times = grouped['session_ts'].agg(['min', 'mean', 'max'])
+
+    uuid_tracker = pd.DataFrame({
+        'random_group': grouped['random_group'].first(),
+        **{name: counts[name] for name in EVENT_COUNT_COLS},
+        'first_session_start_time': session_times['min'],
+        'average_session_start_time': session_times['mean'],
+        'last_session_start_time': session_times['max'],
+        'homepage_pct': counts['home_hit'] / counts['num_page_views'].where(counts['num_page_views'] > 0),
+        **{name: presence[name] for name in URL_PRESENCE_COLS},
+        **{name: presence[name] for name in REFERRER_PRESENCE_COLS}
+    }).reset_index()
 
     return uuid_tracker
 
 # Function to calculate statistics
+@st.cache_data(ttl=300, show_spinner=False)
 def calculate_statistics(uuid_tracker):
-    group_stats = uuid_tracker.groupby('random_group').agg(
+    group_stats = uuid_tracker.groupby('random_group', sort=False, observed=True, as_index=False).agg(
         num_uuid=('uuid', 'nunique'),
         num_sessions_mean=('num_sessions', 'mean'),
         num_page_views_mean=('num_page_views', 'mean'),
@@ -96,24 +214,20 @@ def calculate_statistics(uuid_tracker):
         referral_pcgamer_mean=('referral_pcgamer', 'mean'),
         referral_globalprivacycontrol_mean=('referral_globalprivacycontrol', 'mean'),
         referral_duckduckgo_mean=('referral_duckduckgo', 'mean')
-    ).reset_index()
+    )
     return group_stats
 
 # Function to calculate p-values
+@st.cache_data(ttl=300, show_spinner=False)
 def calculate_p_values(uuid_tracker):
-    p_values = []
-    random_groups = uuid_tracker['random_group'].unique()
-
-    for g1, g2 in combinations(random_groups, 2):
-        for metric in uuid_tracker.columns.difference(['uuid', 'random_group']):
-            g1_data = uuid_tracker[uuid_tracker['random_group'] == g1][metric].dropna()
-            g2_data = uuid_tracker[uuid_tracker['random_group'] == g2][metric].dropna()
-
-            if len(g1_data) > 1 and len(g2_data) > 1:
-                _, p_val = ttest_ind(g1_data, g2_data, equal_var=False)
-                p_values.append({'metric': metric, 'group_pair': f"{g1} vs {g2}", 'p_value': p_val})
+    numeric_cols = uuid_tracker.select_dtypes(include=[np.number]).columns.difference(['random_group']).tolist()
+    groups, pair_i, pair_j, _, p = welch_pairwise(uuid_tracker, numeric_cols)
 
-    return pd.DataFrame(p_values)
+    return pd.DataFrame({
+        'metric': np.tile(numeric_cols, len(pair_i)),
+        'group_pair': np.repeat([f"{groups[a]} vs {groups[b]}" for a, b in zip(pair_i, pair_j)], len(numeric_cols)),
+        'p_value': p.ravel()
+    })
 
 
 def datetime_to_numeric(df, datetime_cols):
@@ -127,8 +241,12 @@ def datetime_to_numeric(df, datetime_cols):
         else:  # tz-aware
             df[col] = df[col].dt.tz_convert(None)
         
-        # Convert to seconds since epoch
-        df[col] = (df[col] - pd.Timestamp("1970-01-01")) // pd.Timedelta('1s')
+        # datetime64[ns] is already nanoseconds since epoch — reinterpret the
+        # buffer as int64 and divide, instead of allocating a Timedelta Series
+        # for a generic subtraction
+        vals = df[col].to_numpy(dtype='datetime64[ns]')
+        secs = vals.view('int64') // 1_000_000_000
+        df[col] = pd.Series(np.where(np.isnat(vals), np.nan, secs), index=df.index)
     return df
 
 
@@ -142,78 +260,88 @@ def convert_datetime_back(group_stats, datetime_cols):
     return group_stats
 
 
-def gen_output_tables(df, datetime_cols):
+# Pure compute half of gen_output_tables — cached so widget reruns skip the
+# datetime conversion, groupby, and t-tests entirely
+@st.cache_data(ttl=300, show_spinner=False)
+def _compute_output_tables(df, datetime_cols):
     # Convert datetime columns to numeric for calculations (seconds precision only)
     df = datetime_to_numeric(df, datetime_cols)
-    print(df.columns)
-    print(df['random_group'])
 
     # Select numeric columns only
     numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns.tolist()
-    print(numeric_cols)
-    print(df.columns)
     numeric_cols.remove('random_group')  # Exclude the grouping variable
     numeric_df = df[['random_group'] + numeric_cols]
-    print(df.columns)
 
-    # Calculate mean and standard deviation by random group
-    group_stats = numeric_df.groupby('random_group').agg(['mean', 'std'])
+    # Calculate mean and standard deviation by random group; .mean()/.std()
+    # (unlike .agg(['mean','std'])) accept the numba engine kwargs
+    gb = numeric_df.groupby('random_group', observed=True)
+    group_stats = pd.concat(
+        [gb.mean(**_NUMBA_GROUPBY_KWARGS), gb.std(**_NUMBA_GROUPBY_KWARGS)],
+        axis=1, keys=['mean', 'std']
+    ).swaplevel(axis=1).reindex(columns=pd.MultiIndex.from_product([numeric_cols, ['mean', 'std']]))
     group_stats = convert_datetime_back(group_stats, datetime_cols)   # Apply the conversion back
 
-    # Prepare for pairwise comparisons
-    groups = sorted(numeric_df['random_group'].unique())
-    pairwise_results = []
+    # Perform all pairwise t-tests in one vectorized pass
+    groups, pair_i, pair_j, _, p = welch_pairwise(numeric_df, numeric_cols)
+    pairwise_results_df = pd.DataFrame({
+        'Characteristic': np.tile(numeric_cols, len(pair_i)),
+        'Group 1': np.repeat([groups[a] for a in pair_i], len(numeric_cols)),
+        'Group 2': np.repeat([groups[b] for b in pair_j], len(numeric_cols)),
+        'p-value': p.ravel()
+    })
+    return group_stats, pairwise_results_df, numeric_cols
 
-    # Perform pairwise t-tests
-    for (group1, group2) in itertools.combinations(groups, 2):
-        group1_data = numeric_df[numeric_df['random_group'] == group1]
-        group2_data = numeric_df[numeric_df['random_group'] == group2]
-        
-        for col in numeric_cols:
-            stat, p_value = ttest_ind(group1_data[col].dropna(), group2_data[col].dropna(), equal_var=False)
-            pairwise_results.append({'Characteristic': col, 
-                                     'Group 1': group1, 
-                                     'Group 2': group2, 
-                                     'p-value': p_value})
-
-    # Convert results to a dataframe
-    pairwise_results_df = pd.DataFrame(pairwise_results)
-    
-    # Output LaTeX table
-    for col in numeric_cols:
-        # Extract summary statistics for the current characteristic
-        summary_stats_col = group_stats[col].reset_index()
-        summary_stats_col.columns = ['random_group', 'Mean', 'SD']
-        
-        # Extract pairwise p-values for the current characteristic
-        pairwise_p_values_col = pairwise_results_df[pairwise_results_df['Characteristic'] == col]
-        pairwise_p_values_col = pairwise_p_values_col.drop(columns=['Characteristic'])
 
-        
-        # Save LaTeX files
-        # summary_stats_col.to_latex(f"{output_path}summary_{col}.tex", index=False)
-        # pairwise_p_values_col.to_latex(f"{output_path}pairwise_p_{col}.tex", index=False)
-        caption_input = col.replace("_", " ")
-        # Display summary statistics
-        st.subheader(f"Statistics for {caption_input}")
-        if not summary_stats_col.empty:
-            st.write(summary_stats_col)
-        else:
-            st.write("No data available for the {caption_input}.")
-        st.subheader(f"P-value comparison for {caption_input}")
-        if not pairwise_p_values_col.empty:
-            st.write(pairwise_p_values_col)
-        else:
-            st.write("No data available for the {caption_input}.")
+def gen_output_tables(df, datetime_cols):
+    group_stats, pairwise_results_df, numeric_cols = _compute_output_tables(df, datetime_cols)
+
+    # One metric selector instead of 2xN stacked tables — each rerun
+    # serializes two small frames rather than a section per characteristic
+    col = st.selectbox("Characteristic:", options=numeric_cols,
+                       format_func=lambda c: c.replace("_", " "))
+
+    # Extract summary statistics for the selected characteristic
+    summary_stats_col = group_stats[col].reset_index()
+    summary_stats_col.columns = ['random_group', 'Mean', 'SD']
+
+    # Extract pairwise p-values for the selected characteristic
+    pairwise_p_values_col = pairwise_results_df[pairwise_results_df['Characteristic'] == col]
+    pairwise_p_values_col = pairwise_p_values_col.drop(columns=['Characteristic'])
+
+    # Save LaTeX files
+    # summary_stats_col.to_latex(f"{output_path}summary_{col}.tex", index=False)
+    # pairwise_p_values_col.to_latex(f"{output_path}pairwise_p_{col}.tex", index=False)
+    caption_input = col.replace("_", " ")
+    # Display summary statistics
+    st.subheader(f"Statistics for {caption_input}")
+    if not summary_stats_col.empty:
+        st.write(summary_stats_col)
+    else:
+        st.write("No data available for the {caption_input}.")
+    st.subheader(f"P-value comparison for {caption_input}")
+    if not pairwise_p_values_col.empty:
+        st.write(pairwise_p_values_col)
+    else:
+        st.write("No data available for the {caption_input}.")
 
     return group_stats, pairwise_results_df
 
 # %%
+# Single cached loader so reruns skip the fetch -> process -> filter chain
+@st.cache_data(ttl=300, show_spinner=False)
+def load_tracker(url):
+    clean_tracker = fetch_and_process_data(url)
+    clean_tracker = process_clean_tracker(clean_tracker)
+    clean_tracker = clean_tracker[~clean_tracker['random_group'].isna()]
+    # One stable sort after the order-sensitive fills: each uuid's rows become
+    # contiguous, so the per-uuid aggregations walk sequential memory. Stable
+    # keeps event order within a uuid intact.
+    return clean_tracker.sort_values(['test_group', 'uuid'], kind='stable', ignore_index=True)
+
+
 # URL for fetching data
 url = 'https://checkmyads.org/wp-content/themes/checkmyads/tracker-data.txt'
-clean_tracker = fetch_and_process_data(url)
-clean_tracker = process_clean_tracker(clean_tracker)
-clean_tracker = clean_tracker[~clean_tracker['random_group'].isna()]
+clean_tracker = load_tracker(url)
 
 # Dropdown for selecting test group
 available_test_groups = clean_tracker['test_group'].unique()
@@ -223,8 +351,15 @@ available_test_groups = available_test_groups[::-1]
 st.set_page_config(page_title="Enhanced Balance Check", page_icon="📊", layout="wide")
 st.title("📊 Real-time Balance Check")
 st.subheader("Select Test Group")
+@st.cache_data(ttl=300, show_spinner=False)
+def split_by_group(clean_tracker):
+    # One groupby pass builds every slice; selection is then a dict lookup
+    # instead of a boolean scan per rerun
+    return dict(iter(clean_tracker.groupby('test_group', observed=True, sort=False)))
+
+
 selected_test_group = st.selectbox("Test Group:", options=available_test_groups)
-selected_clean_tracker = clean_tracker[clean_tracker['test_group'] == selected_test_group]
+selected_clean_tracker = split_by_group(clean_tracker)[selected_test_group]
 selected_uuid_tracker = process_event_data(selected_clean_tracker)
 
 # %%